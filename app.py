@@ -4,12 +4,14 @@ Server utama yang menghubungkan frontend dengan model AI
 """
 
 from flask import Flask, render_template, request, redirect, url_for
-import pickle
+import joblib
 import os
 import random
+import numpy as np
 
 # Import modul NLP
 from nlp_processor import preprocess
+from prediction_batcher import PredictionBatcher
 
 app = Flask(__name__)
 
@@ -20,19 +22,29 @@ VECTORIZER_PATH = 'vectorizer.pkl'
 # Load model dan vectorizer saat startup
 model = None
 vectorizer = None
+batcher = None
 
 
 def load_model():
     """
-    Memuat model dan vectorizer dari file pickle
+    Memuat model dan vectorizer dari file joblib
+    
+    Dipanggil saat import, sehingga dengan `gunicorn --preload` model hanya
+    dimuat sekali di master process lalu dibagi (copy-on-write) ke semua worker
     """
-    global model, vectorizer
+    global model, vectorizer, batcher
     
     if os.path.exists(MODEL_PATH) and os.path.exists(VECTORIZER_PATH):
-        with open(MODEL_PATH, 'rb') as f:
-            model = pickle.load(f)
-        with open(VECTORIZER_PATH, 'rb') as f:
-            vectorizer = pickle.load(f)
+        model = joblib.load(MODEL_PATH)
+        vectorizer = joblib.load(VECTORIZER_PATH)
+        
+        # Bobot dibuat float32 contiguous sebelum fork, agar halaman memorinya
+        # tetap dibagi antar worker dan tidak disalin ulang saat predict
+        model.feature_log_prob_ = np.ascontiguousarray(model.feature_log_prob_, dtype=np.float32)
+        tfidf = vectorizer.named_steps['tfidf']
+        tfidf.idf_ = np.ascontiguousarray(tfidf.idf_, dtype=np.float32)
+        
+        batcher = PredictionBatcher(model, vectorizer)
         print("[INFO] Model dan vectorizer berhasil dimuat!")
         return True
     else:
@@ -41,6 +53,90 @@ def load_model():
         return False
 
 
+# Pool saran per kualitas udara (dibangun sekali saat import)
+_SARAN_POOL = {
+    "Baik": {
+        "warna": "#28a745",  # Hijau
+        "icon": "✅",
+        "deskripsi": "Kualitas udara sangat baik dan sehat untuk semua aktivitas.",
+        "saran_all": (
+            "Aman untuk beraktivitas di luar ruangan sepanjang hari",
+            "Cocok untuk olahraga dan kegiatan outdoor",
+            "Nikmati udara segar dengan membuka jendela rumah",
+            "Tidak perlu menggunakan masker",
+            "Waktu yang tepat untuk jogging atau lari pagi",
+            "Ideal untuk bersepeda di taman atau jalanan",
+            "Bagus untuk piknik bersama keluarga",
+            "Aman untuk anak-anak bermain di luar",
+            "Cocok untuk senam pagi di area terbuka",
+            "Manfaatkan untuk menjemur pakaian",
+            "Baik untuk berkebun atau aktivitas halaman",
+            "Udara segar baik untuk kesehatan mental",
+            "Sempurna untuk hiking atau mendaki",
+            "Aman untuk lansia beraktivitas outdoor",
+            "Waktu tepat untuk olahraga bersama komunitas"
+        )
+    },
+    "Sedang": {
+        "warna": "#ffc107",  # Kuning
+        "icon": "⚠️",
+        "deskripsi": "Kualitas udara cukup baik, namun perlu sedikit perhatian.",
+        "saran_all": (
+            "Kurangi aktivitas berat di luar ruangan",
+            "Gunakan masker jika sensitif terhadap polusi",
+            "Perhatikan gejala seperti batuk atau mata perih",
+            "Tutup jendela jika polusi meningkat",
+            "Batasi waktu olahraga outdoor maksimal 1 jam",
+            "Hindari area dengan lalu lintas padat",
+            "Minum air putih lebih banyak dari biasanya",
+            "Pertimbangkan olahraga indoor hari ini",
+            "Waspadai jika memiliki riwayat asma",
+            "Kurangi aktivitas fisik saat siang hari",
+            "Pantau kondisi udara secara berkala",
+            "Siapkan masker untuk berjaga-jaga",
+            "Hindari area konstruksi atau pembangunan",
+            "Batasi aktivitas outdoor untuk anak kecil",
+            "Pertimbangkan untuk bekerja dari rumah"
+        )
+    },
+    "Tidak Sehat": {
+        "warna": "#dc3545",  # Merah
+        "icon": "🚨",
+        "deskripsi": "Kualitas udara buruk dan berbahaya bagi kesehatan.",
+        "saran_all": (
+            "Hindari aktivitas di luar ruangan",
+            "WAJIB gunakan masker N95 jika harus keluar",
+            "Tutup semua jendela dan pintu rapat-rapat",
+            "Gunakan air purifier jika tersedia",
+            "Segera ke dokter jika mengalami sesak napas",
+            "Jangan biarkan anak-anak bermain di luar",
+            "Batasi aktivitas fisik seminimal mungkin",
+            "Nyalakan AC dengan mode recirculate",
+            "Siapkan obat-obatan pernapasan darurat",
+            "Hindari memasak dengan pembakaran terbuka",
+            "Basahi kain dan letakkan di ventilasi",
+            "Minum air hangat untuk meredakan tenggorokan",
+            "Tetap di dalam ruangan sebisa mungkin",
+            "Hubungi layanan kesehatan jika gejala memburuk",
+            "Evakuasi jika kondisi sangat parah",
+            "Pantau informasi dari BMKG dan Dinkes",
+            "Jangan membakar sampah atau apapun"
+        )
+    }
+}
+
+
+# Field response /predict yang konstan per kualitas udara
+_BASE_RESPONSE = {
+    kualitas: {
+        'error': False,
+        'kualitas': kualitas,
+        'deskripsi': pool["deskripsi"]
+    }
+    for kualitas, pool in _SARAN_POOL.items()
+}
+
+
 def get_saran(kualitas):
     """
     Memberikan saran berdasarkan kualitas udara dengan variasi random
@@ -49,91 +145,12 @@ def get_saran(kualitas):
         kualitas (str): Hasil prediksi kualitas udara
         
     Returns:
-        dict: Saran dan informasi terkait (dengan random pick)
+        list: 5 saran yang dipilih secara random dari pool
     """
-    saran_pool = {
-        "Baik": {
-            "warna": "#28a745",  # Hijau
-            "icon": "✅",
-            "deskripsi": "Kualitas udara sangat baik dan sehat untuk semua aktivitas.",
-            "saran_all": [
-                "Aman untuk beraktivitas di luar ruangan sepanjang hari",
-                "Cocok untuk olahraga dan kegiatan outdoor",
-                "Nikmati udara segar dengan membuka jendela rumah",
-                "Tidak perlu menggunakan masker",
-                "Waktu yang tepat untuk jogging atau lari pagi",
-                "Ideal untuk bersepeda di taman atau jalanan",
-                "Bagus untuk piknik bersama keluarga",
-                "Aman untuk anak-anak bermain di luar",
-                "Cocok untuk senam pagi di area terbuka",
-                "Manfaatkan untuk menjemur pakaian",
-                "Baik untuk berkebun atau aktivitas halaman",
-                "Udara segar baik untuk kesehatan mental",
-                "Sempurna untuk hiking atau mendaki",
-                "Aman untuk lansia beraktivitas outdoor",
-                "Waktu tepat untuk olahraga bersama komunitas"
-            ]
-        },
-        "Sedang": {
-            "warna": "#ffc107",  # Kuning
-            "icon": "⚠️",
-            "deskripsi": "Kualitas udara cukup baik, namun perlu sedikit perhatian.",
-            "saran_all": [
-                "Kurangi aktivitas berat di luar ruangan",
-                "Gunakan masker jika sensitif terhadap polusi",
-                "Perhatikan gejala seperti batuk atau mata perih",
-                "Tutup jendela jika polusi meningkat",
-                "Batasi waktu olahraga outdoor maksimal 1 jam",
-                "Hindari area dengan lalu lintas padat",
-                "Minum air putih lebih banyak dari biasanya",
-                "Pertimbangkan olahraga indoor hari ini",
-                "Waspadai jika memiliki riwayat asma",
-                "Kurangi aktivitas fisik saat siang hari",
-                "Pantau kondisi udara secara berkala",
-                "Siapkan masker untuk berjaga-jaga",
-                "Hindari area konstruksi atau pembangunan",
-                "Batasi aktivitas outdoor untuk anak kecil",
-                "Pertimbangkan untuk bekerja dari rumah"
-            ]
-        },
-        "Tidak Sehat": {
-            "warna": "#dc3545",  # Merah
-            "icon": "🚨",
-            "deskripsi": "Kualitas udara buruk dan berbahaya bagi kesehatan.",
-            "saran_all": [
-                "Hindari aktivitas di luar ruangan",
-                "WAJIB gunakan masker N95 jika harus keluar",
-                "Tutup semua jendela dan pintu rapat-rapat",
-                "Gunakan air purifier jika tersedia",
-                "Segera ke dokter jika mengalami sesak napas",
-                "Jangan biarkan anak-anak bermain di luar",
-                "Batasi aktivitas fisik seminimal mungkin",
-                "Nyalakan AC dengan mode recirculate",
-                "Siapkan obat-obatan pernapasan darurat",
-                "Hindari memasak dengan pembakaran terbuka",
-                "Basahi kain dan letakkan di ventilasi",
-                "Minum air hangat untuk meredakan tenggorokan",
-                "Tetap di dalam ruangan sebisa mungkin",
-                "Hubungi layanan kesehatan jika gejala memburuk",
-                "Evakuasi jika kondisi sangat parah",
-                "Pantau informasi dari BMKG dan Dinkes",
-                "Jangan membakar sampah atau apapun"
-            ]
-        }
-    }
-    
-    pool = saran_pool.get(kualitas, saran_pool["Sedang"])
+    pool = _SARAN_POOL.get(kualitas, _SARAN_POOL["Sedang"])
     
-    # Random pick 4-5 saran dari pool
-    num_saran = random.randint(4, 5)
-    selected_saran = random.sample(pool["saran_all"], min(num_saran, len(pool["saran_all"])))
-    
-    return {
-        "warna": pool["warna"],
-        "icon": pool["icon"],
-        "deskripsi": pool["deskripsi"],
-        "saran": selected_saran
-    }
+    # Random pick 5 saran dari pool (setiap pool berisi minimal 15 saran)
+    return random.sample(pool["saran_all"], 5)
 
 
 @app.route('/')
@@ -180,30 +197,28 @@ def predict():
             'message': 'Silakan isi minimal satu pertanyaan.'
         })
     
-    # Preprocessing
-    processed_text = preprocess(input_text)
+    # Preprocessing per field: jawaban kondisi_* berulang antar request sehingga
+    # hasilnya diambil dari cache preprocess, hanya deskripsi yang diproses ulang
+    fields = (kondisi_kabut, kondisi_bau, kondisi_pernapasan, deskripsi_tambahan)
+    processed_text = ' '.join(filter(None, map(preprocess, fields)))
     
-    # Vectorize
-    text_tfidf = vectorizer.transform([processed_text])
-    
-    # Predict
-    prediction = model.predict(text_tfidf)[0]
-    probability = model.predict_proba(text_tfidf)[0]
+    # Vectorize + Predict (digabung dengan request lain yang datang bersamaan)
+    prediction, probability = batcher.submit(processed_text).wait()
     
     # Buat dictionary probabilitas
-    prob_dict = dict(zip(model.classes_, [round(p * 100, 1) for p in probability]))
+    prob_dict = dict(zip(model.classes_, np.round(probability * 100, 1).tolist()))
     
-    # Dapatkan saran
-    saran_info = get_saran(prediction)
+    # Field konstan diambil dari template per kualitas
+    base_response = _BASE_RESPONSE.get(prediction)
+    if base_response is None:
+        base_response = {**_BASE_RESPONSE["Sedang"], 'kualitas': prediction}
     
     return jsonify({
-        'error': False,
-        'kualitas': prediction,
+        **base_response,
         'input_text': input_text,
         'processed_text': processed_text,
         'probabilitas': prob_dict,
-        'saran': saran_info['saran'],
-        'deskripsi': saran_info['deskripsi']
+        'saran': get_saran(prediction)
     })
 
 
@@ -4,16 +4,26 @@ Script ini melatih model Naive Bayes menggunakan dataset kualitas udara
 dengan preprocessing NLP dan TF-IDF Vectorization
 """
 
+import gc
+import re
+import numpy as np
 import pandas as pd
-import pickle
-from sklearn.feature_extraction.text import TfidfVectorizer
+import joblib
+from sklearn.feature_extraction.text import HashingVectorizer, TfidfTransformer
+from sklearn.pipeline import Pipeline
 from sklearn.naive_bayes import MultinomialNB
 from sklearn.model_selection import train_test_split
 from sklearn.metrics import classification_report, accuracy_score, confusion_matrix
 import os
 
 # Import modul NLP kita
-from nlp_processor import preprocess, preprocess_batch
+from nlp_processor import (
+    preprocess_batch, case_folding, remove_punctuation, tokenize, stemmer
+)
+
+# Regex tokenizer untuk vectorizer (sama dengan token_pattern default sklearn),
+# dikompilasi sekali dan ikut tersimpan di dalam pickle vectorizer
+_TOKEN_RE = re.compile(r'\b\w\w+\b')
 
 
 def load_dataset(filepath='dataset_udara.csv'):
@@ -44,7 +54,7 @@ def preprocess_dataset(df):
         pandas.DataFrame: Dataset dengan kolom teks yang sudah diproses
     """
     print("\n[INFO] Memulai preprocessing NLP...")
-    df['processed_text'] = preprocess_batch(df['jawaban_user'].tolist())
+    df['processed_text'] = preprocess_batch(df['jawaban_user'].tolist(), n_jobs=-1)
     print("[INFO] Preprocessing selesai!")
     
     # Tampilkan contoh hasil preprocessing
@@ -57,9 +67,29 @@ def preprocess_dataset(df):
     return df
 
 
+def build_stem_map(df):
+    """
+    Membangun kamus stemming {kata: kata_dasar} dari seluruh kata di dataset
+    
+    Args:
+        df (pandas.DataFrame): Dataset input
+        
+    Returns:
+        dict: Kamus hasil stemming Sastrawi
+    """
+    print("\n[INFO] Membangun kamus stemming...")
+    words = set()
+    for text in df['jawaban_user']:
+        words.update(tokenize(remove_punctuation(case_folding(text))))
+    
+    stem_map = {word: stemmer.stem(word) for word in words}
+    print(f"[INFO] Jumlah kata dalam kamus stemming: {len(stem_map)}")
+    return stem_map
+
+
 def train_model(df):
     """
-    Melatih model Naive Bayes dengan TF-IDF Vectorization
+    Melatih model Naive Bayes dengan TF-IDF Vectorization (Hashing + TF-IDF)
     
     Args:
         df (pandas.DataFrame): Dataset yang sudah dipreprocess
@@ -83,21 +113,46 @@ def train_model(df):
     print(f"[INFO] Data Testing: {len(X_test)} sampel")
     
     # TF-IDF Vectorization
+    # HashingVectorizer tidak membangun vocabulary, sehingga yang perlu
+    # disimpan hanya bobot IDF dari TfidfTransformer
     print("\n[INFO] Melakukan TF-IDF Vectorization...")
-    vectorizer = TfidfVectorizer(
-        max_features=1000,  # Maksimal 1000 fitur
-        ngram_range=(1, 2),  # Unigram dan Bigram
-        min_df=1  # Minimal muncul di 1 dokumen
-    )
+    vectorizer = Pipeline([
+        ('hash', HashingVectorizer(
+            n_features=4096,  # Jumlah bucket hash
+            tokenizer=_TOKEN_RE.findall,  # Tokenizer regex yang sudah dikompilasi
+            token_pattern=None,
+            ngram_range=(1, 2),  # Unigram dan Bigram
+            alternate_sign=False,  # Nilai fitur tetap non-negatif untuk Naive Bayes
+            norm=None,  # Normalisasi dilakukan oleh TfidfTransformer
+            dtype=np.float32  # Matriks fitur float32 (setengah ukuran float64)
+        )),
+        ('tfidf', TfidfTransformer(
+            sublinear_tf=True,  # tf diganti 1 + log(tf)
+            norm='l2'
+        ))
+    ])
     
     X_train_tfidf = vectorizer.fit_transform(X_train)
-    X_test_tfidf = vectorizer.transform(X_test)
-    print(f"[INFO] Jumlah fitur TF-IDF: {len(vectorizer.get_feature_names_out())}")
+    print(f"[INFO] Jumlah fitur TF-IDF: {X_train_tfidf.shape[1]}")
+    print(f"[INFO] Fitur terisi pada data training: {X_train_tfidf.getnnz(axis=0).astype(bool).sum()}")
+    
+    # Teks training tidak dipakai lagi setelah di-vectorize
+    del X, X_train
     
     # Training Multinomial Naive Bayes
     print("\n[INFO] Training Multinomial Naive Bayes...")
     model = MultinomialNB(alpha=1.0)  # Laplace smoothing
     model.fit(X_train_tfidf, y_train)
+    
+    # Matriks training dilepas sebelum data testing di-vectorize,
+    # agar keduanya tidak berada di memori bersamaan
+    del X_train_tfidf, y_train
+    gc.collect()
+    
+    # Simpan parameter model sebagai float32 agar sama dengan matriks TF-IDF,
+    # sehingga perkalian saat predict tidak perlu upcast ke float64
+    model.feature_log_prob_ = model.feature_log_prob_.astype(np.float32)
+    model.class_log_prior_ = model.class_log_prior_.astype(np.float32)
     print("[INFO] Training selesai!")
     
     # Evaluasi model
@@ -105,6 +160,7 @@ def train_model(df):
     print("EVALUASI MODEL")
     print("-" * 60)
     
+    X_test_tfidf = vectorizer.transform(X_test)
     y_pred = model.predict(X_test_tfidf)
     accuracy = accuracy_score(y_test, y_pred)
     
@@ -118,29 +174,36 @@ def train_model(df):
     print(f"Labels: {labels}")
     print(cm)
     
+    del X_test, X_test_tfidf, y_test, y_pred
+    gc.collect()
+    
     return model, vectorizer, accuracy
 
 
-def save_model(model, vectorizer, model_path='model_nb.pkl', vectorizer_path='vectorizer.pkl'):
+def save_model(model, vectorizer, stem_map, model_path='model_nb.pkl',
+               vectorizer_path='vectorizer.pkl', stem_map_path='stem_map.pkl'):
     """
-    Menyimpan model dan vectorizer ke file pickle
+    Menyimpan model, vectorizer, dan kamus stemming ke file joblib (terkompresi LZ4)
     
     Args:
         model: Model Naive Bayes yang sudah ditraining
         vectorizer: TF-IDF Vectorizer yang sudah di-fit
+        stem_map (dict): Kamus stemming hasil build_stem_map
         model_path (str): Path untuk menyimpan model
         vectorizer_path (str): Path untuk menyimpan vectorizer
+        stem_map_path (str): Path untuk menyimpan kamus stemming
     """
     print("\n[INFO] Menyimpan model dan vectorizer...")
     
-    with open(model_path, 'wb') as f:
-        pickle.dump(model, f)
+    joblib.dump(model, model_path, compress=('lz4', 3))
     print(f"[INFO] Model disimpan ke: {model_path}")
     
-    with open(vectorizer_path, 'wb') as f:
-        pickle.dump(vectorizer, f)
+    joblib.dump(vectorizer, vectorizer_path, compress=('lz4', 3))
     print(f"[INFO] Vectorizer disimpan ke: {vectorizer_path}")
     
+    joblib.dump(stem_map, stem_map_path, compress=('lz4', 3))
+    print(f"[INFO] Kamus stemming disimpan ke: {stem_map_path}")
+    
     print("\n[SUCCESS] Model dan vectorizer berhasil disimpan!")
 
 
@@ -162,17 +225,17 @@ def test_prediction(model, vectorizer):
         "Asap tebal menyengat, susah napas, mata perih parah"
     ]
     
-    for text in test_inputs:
-        # Preprocess
-        processed = preprocess(text)
-        # Vectorize
-        text_tfidf = vectorizer.transform([processed])
-        # Predict
-        prediction = model.predict(text_tfidf)[0]
-        probability = model.predict_proba(text_tfidf)[0]
-        
+    # Preprocess, vectorize, dan predict seluruh input sekaligus
+    processed = preprocess_batch(test_inputs)
+    text_tfidf = vectorizer.transform(processed)
+    predictions = model.predict(text_tfidf)
+    probabilities = model.predict_proba(text_tfidf)
+    
+    for text, processed_text, prediction, probability in zip(
+        test_inputs, processed, predictions, probabilities
+    ):
         print(f"\nInput: {text}")
-        print(f"Processed: {processed}")
+        print(f"Processed: {processed_text}")
         print(f"Prediksi: {prediction}")
         print(f"Probabilitas: {dict(zip(model.classes_, [f'{p:.2%}' for p in probability]))}")
 
@@ -192,13 +255,16 @@ def main():
     # 2. Preprocessing
     df = preprocess_dataset(df)
     
-    # 3. Training
+    # 3. Kamus stemming
+    stem_map = build_stem_map(df)
+    
+    # 4. Training
     model, vectorizer, accuracy = train_model(df)
     
-    # 4. Save model
-    save_model(model, vectorizer)
+    # 5. Save model
+    save_model(model, vectorizer, stem_map)
     
-    # 5. Test prediction
+    # 6. Test prediction
     test_prediction(model, vectorizer)
     
     print("\n" + "=" * 60)
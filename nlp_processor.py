@@ -4,17 +4,22 @@ Modul ini berisi fungsi-fungsi preprocessing teks bahasa Indonesia
 menggunakan teknik NLP: Case Folding, Tokenizing, Stopword Removal, dan Stemming
 """
 
+import os
 import re
 import string
+from functools import lru_cache
+from itertools import chain
+import pandas as pd
+import joblib
+from joblib import Parallel, delayed
 from Sastrawi.Stemmer.StemmerFactory import StemmerFactory
 from Sastrawi.StopWordRemover.StopWordRemoverFactory import StopWordRemoverFactory
 
-# Inisialisasi Sastrawi Stemmer dan Stopword Remover
+# Inisialisasi Sastrawi Stemmer dan daftar stopwords Sastrawi
 stemmer_factory = StemmerFactory()
 stemmer = stemmer_factory.create_stemmer()
 
 stopword_factory = StopWordRemoverFactory()
-stopword_remover = stopword_factory.create_stop_word_remover()
 
 # Daftar stopwords tambahan khusus untuk domain kualitas udara
 CUSTOM_STOPWORDS = {
@@ -24,6 +29,20 @@ CUSTOM_STOPWORDS = {
     'mereka', 'dia', 'ia', 'sangat', 'sekali', 'terasa', 'seperti'
 }
 
+# Gabungan stopwords Sastrawi dan custom untuk filter berbasis set
+_ALL_STOPWORDS = frozenset(stopword_factory.get_stop_words()) | CUSTOM_STOPWORDS
+
+# Tabel translasi dan regex untuk pembersihan teks (dikompilasi sekali)
+_PUNCT_TABLE = str.maketrans('', '', string.punctuation)
+_DIGIT_RE = re.compile(r'\d+')
+_WS_RE = re.compile(r'\s+')
+
+# Path ke kamus hasil stemming yang dibangun saat training
+STEM_MAP_PATH = 'stem_map.pkl'
+
+# Kamus {kata: kata_dasar}, dimuat saat pertama kali dibutuhkan
+_stem_map = None
+
 
 def case_folding(text):
     """
@@ -50,13 +69,8 @@ def remove_punctuation(text):
     Returns:
         str: Teks tanpa tanda baca
     """
-    # Hapus tanda baca
-    text = text.translate(str.maketrans('', '', string.punctuation))
-    # Hapus angka
-    text = re.sub(r'\d+', '', text)
-    # Hapus whitespace berlebih
-    text = re.sub(r'\s+', ' ', text).strip()
-    return text
+    # Hapus tanda baca, angka, lalu whitespace berlebih
+    return _WS_RE.sub(' ', _DIGIT_RE.sub('', text.translate(_PUNCT_TABLE))).strip()
 
 
 def tokenize(text):
@@ -82,23 +96,46 @@ def remove_stopwords(tokens):
     Returns:
         list: Daftar kata tanpa stopwords
     """
-    # Gabungkan tokens menjadi string untuk Sastrawi
-    text = ' '.join(tokens)
+    return [word for word in tokens if word not in _ALL_STOPWORDS]
+
+
+@lru_cache(maxsize=100_000)
+def _stem_cached(word):
+    """
+    Stemming satu kata dengan memoization, karena kata yang sama
+    (misal: asap, kabut, perih) sering muncul berulang antar request
     
-    # Gunakan Sastrawi stopword remover
-    text = stopword_remover.remove(text)
+    Args:
+        word (str): Kata input
+        
+    Returns:
+        str: Kata dalam bentuk dasar
+    """
+    return stemmer.stem(word)
+
+
+def load_stem_map():
+    """
+    Memuat kamus stemming dari file joblib (hanya sekali)
     
-    # Filter tambahan dengan custom stopwords
-    result_tokens = text.split()
-    result_tokens = [word for word in result_tokens if word not in CUSTOM_STOPWORDS]
+    Returns:
+        dict: Kamus {kata: kata_dasar}, kosong jika file belum ada
+    """
+    global _stem_map
     
-    return result_tokens
+    if _stem_map is None:
+        if os.path.exists(STEM_MAP_PATH):
+            _stem_map = joblib.load(STEM_MAP_PATH)
+        else:
+            _stem_map = {}
+    return _stem_map
 
 
 def stem(tokens):
     """
     Melakukan stemming (mengubah kata ke bentuk dasar)
-    menggunakan algoritma Sastrawi untuk Bahasa Indonesia
+    menggunakan kamus hasil training, dengan fallback ke
+    algoritma Sastrawi untuk kata di luar kamus
     
     Args:
         tokens (list): Daftar kata
@@ -106,12 +143,14 @@ def stem(tokens):
     Returns:
         list: Daftar kata dalam bentuk dasar
     """
-    return [stemmer.stem(word) for word in tokens]
+    stem_map = load_stem_map()
+    return [stem_map[word] if word in stem_map else _stem_cached(word) for word in tokens]
 
 
+@lru_cache(maxsize=4096)
 def preprocess(text):
     """
-    Pipeline lengkap preprocessing NLP:
+    Pipeline lengkap preprocessing NLP (hasil di-cache untuk input berulang):
     1. Case Folding
     2. Remove Punctuation
     3. Tokenizing
@@ -143,9 +182,11 @@ def preprocess(text):
     return ' '.join(tokens)
 
 
-def preprocess_batch(texts):
+def _preprocess_chunk(texts):
     """
-    Preprocessing untuk batch/list teks
+    Preprocessing untuk satu potongan batch. Case folding, penghapusan tanda
+    baca, dan tokenizing dijalankan sekaligus untuk seluruh potongan dengan
+    pandas, lalu setiap kata unik cukup di-stem satu kali
     
     Args:
         texts (list): Daftar teks input
@@ -153,7 +194,49 @@ def preprocess_batch(texts):
     Returns:
         list: Daftar teks yang sudah diproses
     """
-    return [preprocess(text) for text in texts]
+    series = pd.Series(texts, dtype=object)
+    
+    # Step 1-3: Case Folding, Remove Punctuation, Tokenizing
+    tokens = (
+        series.str.lower()
+        .fillna('')
+        .str.translate(_PUNCT_TABLE)
+        .str.replace(_DIGIT_RE, '', regex=True)
+        .str.split()
+    )
+    
+    # Step 4: Stopword Removal
+    tokens = tokens.map(remove_stopwords)
+    
+    # Step 5: Stemming (hanya untuk kata unik di seluruh batch)
+    vocab = list(set(chain.from_iterable(tokens)))
+    stems = dict(zip(vocab, stem(vocab)))
+    
+    return tokens.map(lambda words: ' '.join(stems[word] for word in words)).tolist()
+
+
+def preprocess_batch(texts, n_jobs=1, batch_size=1000):
+    """
+    Preprocessing untuk batch/list teks. Jika n_jobs bukan 1 dan jumlah teks
+    melebihi batch_size, batch dipecah dan diproses paralel di beberapa proses
+    
+    Args:
+        texts (list): Daftar teks input
+        n_jobs (int): Jumlah proses paralel (-1 = semua core CPU)
+        batch_size (int): Jumlah teks per potongan yang dikirim ke tiap proses
+        
+    Returns:
+        list: Daftar teks yang sudah diproses
+    """
+    texts = list(texts)
+    if n_jobs == 1 or len(texts) <= batch_size:
+        return _preprocess_chunk(texts)
+    
+    chunks = [texts[i:i + batch_size] for i in range(0, len(texts), batch_size)]
+    results = Parallel(n_jobs=n_jobs, backend='loky')(
+        delayed(_preprocess_chunk)(chunk) for chunk in chunks
+    )
+    return list(chain.from_iterable(results))
 
 
 # Testing module jika dijalankan langsung
@@ -0,0 +1,150 @@
+"""
+Prediction Batcher untuk Sistem Pakar Kualitas Udara
+Modul ini mengumpulkan request prediksi yang datang bersamaan, lalu
+menjalankan vectorize dan predict sekaligus dalam satu batch
+"""
+
+import os
+import queue
+import threading
+import time
+import numpy as np
+import scipy.sparse as sp
+
+
+class PendingPrediction:
+    """
+    Hasil prediksi untuk satu teks yang sedang menunggu diproses batcher
+    """
+
+    def __init__(self, text):
+        self.text = text
+        self._event = threading.Event()
+        self._result = None
+        self._error = None
+
+    def set_result(self, result):
+        """Menyimpan hasil prediksi dan membangunkan request yang menunggu"""
+        self._result = result
+        self._event.set()
+
+    def set_error(self, error):
+        """Menyimpan error agar dilempar ulang di request yang menunggu"""
+        self._error = error
+        self._event.set()
+
+    def wait(self):
+        """
+        Menunggu sampai batch yang memuat teks ini selesai diproses
+
+        Returns:
+            tuple: (prediksi, array probabilitas per kelas)
+        """
+        self._event.wait()
+        if self._error is not None:
+            raise self._error
+        return self._result
+
+
+class PredictionBatcher:
+    """
+    Background thread yang menampung teks hasil preprocessing selama
+    maksimal `max_wait` detik, lalu memprediksi semuanya sekaligus
+
+    Args:
+        model: Model Naive Bayes yang sudah ditraining
+        vectorizer: Vectorizer yang sudah di-fit
+        max_wait (float): Waktu tunggu maksimal untuk mengumpulkan batch (detik)
+        max_batch_size (int): Jumlah teks maksimal per batch
+    """
+
+    def __init__(self, model, vectorizer, max_wait=0.005, max_batch_size=64):
+        self.model = model
+        self.vectorizer = vectorizer
+        self.max_wait = max_wait
+        self.max_batch_size = max_batch_size
+        self._queue = None
+        self._lock = threading.Lock()
+        self._pid = None
+
+        # Bobot MultinomialNB disiapkan sekali dalam bentuk (n_fitur, n_kelas)
+        # untuk scoring langsung tanpa melewati predict_proba sklearn
+        self._weights = np.ascontiguousarray(model.feature_log_prob_.T, dtype=np.float32)
+        self._bias = np.asarray(model.class_log_prior_, dtype=np.float64)
+
+    def submit(self, text):
+        """
+        Memasukkan teks ke antrean prediksi
+
+        Args:
+            text (str): Teks yang sudah dipreprocess
+
+        Returns:
+            PendingPrediction: Panggil .wait() untuk mendapatkan hasilnya
+        """
+        self._ensure_worker()
+        pending = PendingPrediction(text)
+        self._queue.put(pending)
+        return pending
+
+    def _ensure_worker(self):
+        # Thread dijalankan saat request pertama di tiap process (bukan saat
+        # import), karena thread tidak ikut ter-copy saat gunicorn melakukan fork
+        if self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._pid != os.getpid():
+                self._queue = queue.Queue()
+                threading.Thread(target=self._run, args=(self._queue,), daemon=True).start()
+                self._pid = os.getpid()
+
+    def _run(self, pending_queue):
+        while True:
+            batch = [pending_queue.get()]
+            deadline = time.monotonic() + self.max_wait
+
+            while len(batch) < self.max_batch_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(pending_queue.get(timeout=remaining))
+                except queue.Empty:
+                    break
+
+            self._process(batch)
+
+    def _predict_proba(self, text_tfidf):
+        """
+        Menghitung probabilitas MultinomialNB langsung dari matriks TF-IDF sparse:
+        softmax(X @ feature_log_prob_.T + class_log_prior_)
+
+        Args:
+            text_tfidf: Matriks TF-IDF (CSR) hasil vectorizer
+
+        Returns:
+            numpy.ndarray: Probabilitas per kelas (float64), shape (n_teks, n_kelas)
+        """
+        # Vectorizer harus menghasilkan matriks sparse; versi dense akan
+        # membuat array (n_teks, n_fitur) penuh di setiap request
+        assert sp.issparse(text_tfidf), "Output vectorizer harus berupa matriks sparse"
+
+        # Perkalian sparse x dense tetap float32; softmax dihitung dalam float64
+        # agar stabil dan hasilnya bisa langsung di-serialize ke JSON
+        joint_log_likelihood = np.asarray(text_tfidf @ self._weights, dtype=np.float64) + self._bias
+        joint_log_likelihood -= joint_log_likelihood.max(axis=1, keepdims=True)
+        probabilities = np.exp(joint_log_likelihood)
+        probabilities /= probabilities.sum(axis=1, keepdims=True)
+        return probabilities
+
+    def _process(self, batch):
+        try:
+            text_tfidf = self.vectorizer.transform([pending.text for pending in batch])
+            probabilities = self._predict_proba(text_tfidf)
+        except Exception as e:
+            for pending in batch:
+                pending.set_error(e)
+            return
+
+        for pending, probability in zip(batch, probabilities):
+            pending.set_result((self.model.classes_[probability.argmax()], probability))